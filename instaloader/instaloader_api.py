@@ -1,10 +1,28 @@
+import asyncio
+import errno
+import hashlib
+import logging
+import multiprocessing
 import os
-import sys
+import shutil
+import sqlite3
+import threading
+import time
+import unicodedata
+import uuid
 from argparse import ArgumentTypeError
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import suppress
+from datetime import datetime
+from enum import IntEnum
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
 
-from typing import List, Optional
+import requests
+import requests.adapters
 
-from enum import IntEnum
 from instaloader import (
     AbortDownloadException,
     BadCredentialsException,
@@ -14,7 +32,9 @@ from instaloader import (
     LoginException,
     Post,
     Profile,
+    InstaloaderContext,
     ProfileNotExistsException,
+    RateController,
     StoryItem,
     TwoFactorAuthRequiredException,
     load_structure_from_file,
@@ -30,6 +50,58 @@ try:
 except ImportError:
     bc3_library = False
 
+logger = logging.getLogger("instaloader_api")
+
+try:
+    # Linear-time matching, immune to catastrophic backtracking on adversarial input
+    import re2 as re
+except ImportError:
+    import re
+
+PROFILE_NAME_PATTERN = re.compile(r"[A-Za-z0-9._]{1,30}")
+# Hashtags consist of letters, combining marks and digits of any script, and '_'. The re module has no classes
+# for Unicode categories, so is_valid_hashtag() checks the category of each character with either engine.
+HASHTAG_CATEGORIES = frozenset("LMN")
+HASHTAG_MAX_LENGTH = 100
+
+
+def is_valid_profile_name(profile_name: Any) -> bool:
+    """Check whether a value is a syntactically valid Instagram profile name."""
+    return isinstance(profile_name, str) and PROFILE_NAME_PATTERN.fullmatch(profile_name) is not None
+
+
+def is_valid_hashtag(hashtag: Any) -> bool:
+    """Check whether a value is a syntactically valid hashtag, without the leading '#'."""
+    return (isinstance(hashtag, str) and 0 < len(hashtag) <= HASHTAG_MAX_LENGTH and
+            all(char == "_" or unicodedata.category(char)[0] in HASHTAG_CATEGORIES for char in hashtag))
+
+
+_BROWSERS: Mapping[str, Any] = MappingProxyType({
+    "brave": browser_cookie3.brave,
+    "chrome": browser_cookie3.chrome,
+    "chromium": browser_cookie3.chromium,
+    "edge": browser_cookie3.edge,
+    "firefox": browser_cookie3.firefox,
+    "librewolf": browser_cookie3.librewolf,
+    "opera": browser_cookie3.opera,
+    "opera_gx": browser_cookie3.opera_gx,
+    "safari": browser_cookie3.safari,
+    "vivaldi": browser_cookie3.vivaldi,
+} if bc3_library else {})
+
+
+@lru_cache(maxsize=16)
+def _read_browser_cookies(browser: str, cookiefile: Optional[str]) -> Tuple[Tuple[str, str], ...]:
+    """
+    Read the Instagram cookies of a browser as (name, value) pairs.
+
+    Cached, so that repeated logins do not read and decrypt the cookie store again. Call
+    _read_browser_cookies.cache_clear() once the cookies turn out to be invalid.
+    """
+    # Let browser_cookie3 filter by domain, so that unrelated cookies are neither read nor decrypted
+    cookie_jar = _BROWSERS[browser](cookie_file=cookiefile, domain_name="instagram.com")
+    return tuple({cookie.name: cookie.value for cookie in cookie_jar}.items())
+
 
 class ExitCode(IntEnum):
     SUCCESS = 0
@@ -41,10 +113,278 @@ class ExitCode(IntEnum):
     UNEXPECTED_ERROR = 99
 
 
+class TokenBucket:  # pylint:disable=too-few-public-methods
+    """
+    Token bucket, allowing rate acquisitions per second on average and bursts of up to burst.
+
+    Its state is kept in shared memory, so that the bucket is shared by all threads and by child processes that
+    are forked from the creating process or receive the bucket when they are started.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        # Tokens left and time of the last acquisition
+        self._state = multiprocessing.RawArray('d', [float(burst), time.monotonic()])
+        self._lock = multiprocessing.Lock()
+
+    def acquire(self) -> float:
+        """
+        Take a token from the bucket.
+
+        Returns:
+            float: Seconds the caller has to wait before the token may be used.
+        """
+        with self._lock:
+            now = time.monotonic()
+            tokens, last = self._state
+            tokens = min(float(self.burst), tokens + (now - last) * self.rate) - 1
+            self._state[0], self._state[1] = tokens, now
+            return -tokens / self.rate if tokens < 0 else 0.0
+
+
+def _bucket_from_env(name: str, per_hour: float, burst: int) -> TokenBucket:
+    per_hour = float(os.environ.get(f"INSTALOADER_{name.upper()}_PER_HOUR", per_hour))
+    burst = int(os.environ.get(f"INSTALOADER_{name.upper()}_BURST", burst))
+    if per_hour <= 0:
+        raise InvalidArgumentException(f"INSTALOADER_{name.upper()}_PER_HOUR must be positive.")
+    return TokenBucket(per_hour / 3600, burst)
+
+
+# Request budgets per endpoint type, shared by all loaders and worker processes since Instagram limits per IP
+RATE_BUCKETS: Dict[str, TokenBucket] = {
+    "graphql": _bucket_from_env("graphql", 200, 20),
+    "profile": _bucket_from_env("profile", 3600 / 6.5, 1),
+    "iphone_api": _bucket_from_env("iphone_api", 400, 10),
+}
+
+
+class TokenBucketRateController(RateController):
+    """
+    RateController that paces queries through RATE_BUCKETS before applying Instaloader's own limits.
+
+    Keeping a steady request rate avoids running into 429 responses, which are penalized with much
+    longer waits.
+    """
+
+    def wait_before_query(self, query_type: str) -> None:
+        if query_type == "iphone":
+            bucket = RATE_BUCKETS["iphone_api"]
+        elif query_type == "other":
+            bucket = RATE_BUCKETS["profile"]
+        else:
+            bucket = RATE_BUCKETS["graphql"]
+        waittime = bucket.acquire()
+        if waittime > 0:
+            self.sleep(waittime)
+        super().wait_before_query(query_type)
+
+
+# Size of the pieces in which downloaded media is written to disk
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+# Directory for downloads in progress, e.g. on a fast local disk; None to write them next to their target
+STAGING_DIR = os.environ.get("INSTALOADER_STAGING_DIR")
+
+
+def _copy_file(src: str, dst: str):
+    """Copy a file, letting the kernel move the bytes with sendfile(2) where supported."""
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        offset = 0
+        if hasattr(os, "sendfile"):
+            size = os.fstat(fsrc.fileno()).st_size
+            try:
+                while offset < size:
+                    sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                return
+            except OSError as err:
+                # Not supported between these files (e.g. only to sockets on macOS)
+                if err.errno not in (errno.EINVAL, errno.ENOSYS, errno.ENOTSOCK):
+                    raise
+        fsrc.seek(offset)
+        fdst.seek(offset)
+        shutil.copyfileobj(fsrc, fdst)
+
+
+def move_file(src: str, dst: str):
+    """
+    Move a file, renaming it if possible and copying it across file systems otherwise.
+
+    Args:
+        src (str): Current path of the file.
+        dst (str): Path to move the file to; replaced if it exists.
+    """
+    try:
+        os.replace(src, dst)
+    except OSError as err:
+        if err.errno != errno.EXDEV:
+            raise
+        tempname = dst + '.temp'
+        try:
+            _copy_file(src, tempname)
+            os.replace(tempname, dst)
+        except BaseException:
+            with suppress(OSError):
+                os.remove(tempname)
+            raise
+        os.remove(src)
+
+
+# Connections kept open per host and loader; at least MEDIA_DOWNLOAD_WORKERS so concurrent downloads can reuse them
+MAX_CONNECTIONS = int(os.environ.get("INSTALOADER_MAX_CONNECTIONS", "64"))
+
+
+class _PooledAdapter(requests.adapters.HTTPAdapter):
+    """HTTPAdapter that keeps its connections open when a session it is mounted on is closed."""
+
+    def close(self):
+        pass
+
+    def close_pool(self):
+        """Close all pooled connections."""
+        super().close()
+
+
+class StreamingInstaloaderContext(InstaloaderContext):
+    """
+    InstaloaderContext writing downloaded media to disk in DOWNLOAD_CHUNK_SIZE pieces as it arrives.
+
+    The sessions it creates share one connection pool, so that e.g. every media download does not open
+    and handshake a new TLS connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._adapter = _PooledAdapter(pool_connections=16, pool_maxsize=MAX_CONNECTIONS)
+        super().__init__(*args, **kwargs)
+
+    def _mount_adapter(self, session: requests.Session) -> requests.Session:
+        session.mount('https://', self._adapter)
+        return session
+
+    def get_anonymous_session(self) -> requests.Session:
+        return self._mount_adapter(super().get_anonymous_session())
+
+    def load_session(self, username, sessiondata):
+        super().load_session(username, sessiondata)
+        self._mount_adapter(self._session)
+
+    def login(self, user, passwd):
+        super().login(user, passwd)
+        self._mount_adapter(self._session)
+
+    def two_factor_login(self, two_factor_code):
+        super().two_factor_login(two_factor_code)
+        self._mount_adapter(self._session)
+
+    def close(self):
+        super().close()
+        self._adapter.close_pool()
+
+    def write_raw(self, resp: Union[bytes, requests.Response], filename: str) -> None:
+        if not isinstance(resp, requests.Response):
+            super().write_raw(resp, filename)
+            return
+        self.log(filename, end=' ', flush=True)
+        if STAGING_DIR is not None:
+            tempfilename = os.path.join(STAGING_DIR, uuid.uuid4().hex + '.temp')
+        else:
+            tempfilename = filename + '.temp'
+        try:
+            with open(tempfilename, 'wb') as file:
+                for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    file.write(chunk)
+            move_file(tempfilename, filename)
+        except BaseException:
+            # Unlike filename + '.temp', a staged file would not be overwritten by the next attempt
+            with suppress(OSError):
+                os.remove(tempfilename)
+            raise
+
+
+# Media files downloaded at the same time, shared by all loaders to bound the request rate to Instagram's CDN
+MEDIA_DOWNLOAD_WORKERS = int(os.environ.get("INSTALOADER_MEDIA_WORKERS", "16"))
+
+
+def _new_media_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=MEDIA_DOWNLOAD_WORKERS, thread_name_prefix="instaloader-media")
+
+
+class ConcurrentInstaloader(Instaloader):
+    """
+    Instaloader that downloads the media files of a post concurrently.
+
+    Within download_post(), download_pic() calls are queued to a thread pool and awaited before
+    download_post() returns. Posts are still processed one after another, so that fast_update keeps
+    stopping at the first already-downloaded post. Video posts are downloaded as before, since
+    Instaloader treats errors of their thumbnails as non-fatal within download_post().
+    """
+
+    # Shared by all instances, see MEDIA_DOWNLOAD_WORKERS
+    _media_pool = _new_media_pool()
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        context = self.context
+        self.context = StreamingInstaloaderContext(context.sleep, context.quiet, context.user_agent,
+                                                   context.max_connection_attempts, context.request_timeout,
+                                                   kwargs.get("rate_controller"), context.fatal_status_codes,
+                                                   context.iphone_support)
+        context.close()
+        self._media_downloads = threading.local()
+
+    def download_pic(self, filename: str, url: str, mtime: datetime,
+                     filename_suffix: Optional[str] = None, _attempt: int = 1) -> bool:
+        pending = getattr(self._media_downloads, "pending", None)
+        if pending is None:
+            return super().download_pic(filename, url, mtime, filename_suffix)
+        pending.append(self._media_pool.submit(super().download_pic, filename, url, mtime, filename_suffix))
+        # The actual result is combined into the return value of download_post()
+        return True
+
+    def download_post(self, post: Post, target: Union[str, Path]) -> bool:
+        if post.typename == 'GraphVideo':
+            # The thumbnail download has to raise within the error_catcher() around it; with just a thumbnail
+            # and a video there is little to gain from deferring them anyway
+            return super().download_post(post, target)
+        pending: List[Future] = []
+        self._media_downloads.pending = pending
+        try:
+            downloaded = super().download_post(post, target)
+        finally:
+            self._media_downloads.pending = None
+            wait(pending)
+        return all(future.result() for future in pending) and downloaded
+
+    @classmethod
+    def reset_media_pool(cls):
+        """Replace the media download pool, e.g. in a forked child process, which lacks the pool's threads."""
+        cls._media_pool = _new_media_pool()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=ConcurrentInstaloader.reset_media_pool)
+
+
+# GraphQL query returning the user a session is logged in as
+TEST_LOGIN_QUERY_HASH = "d6f4427fbe92d846298cf93df0b937d3"
+# Seconds for which a successful login check of a set of cookies is trusted
+LOGIN_CACHE_TTL = 60
+# Seconds for which a looked up profile is reused
+PROFILE_CACHE_TTL = 300
+
+
 class InstagramLoader:
+    # Maps a hash of session cookies to the username they logged in as and when that was checked
+    _login_cache: Dict[str, Tuple[str, float]] = {}
+    _login_cache_lock = threading.Lock()
+
     def __init__(self):
         """Initialize the Instagram loader."""
-        self.loader = Instaloader()
+        self.loader = ConcurrentInstaloader(rate_controller=TokenBucketRateController)
+        self._profile_cache: Dict[str, Tuple[Profile, float]] = {}
+        self._profile_cache_lock = threading.Lock()
 
     def login(self, username: str, password: str) -> bool:
         """
@@ -61,9 +401,64 @@ class InstagramLoader:
             self.loader.login(username, password)
             return True
         except (BadCredentialsException, TwoFactorAuthRequiredException, LoginException) as e:
-            print(f"Login failed: {e}", file=sys.stderr)
+            logger.warning("Login failed: %s", e)
             return False
 
+    def save_session(self) -> dict:
+        """
+        Save the session cookies to a dictionary.
+
+        Returns:
+            dict: Session cookies.
+        """
+        return self.loader.save_session()
+
+    def load_session(self, username: str, session_data: dict):
+        """
+        Load session cookies from a dictionary.
+
+        Args:
+            username (str): Instagram username.
+            session_data (dict): Session cookies, as returned by save_session().
+        """
+        self.loader.load_session(username, session_data)
+
+    def save_session_to_file(self, filename: str):
+        """
+        Save the session cookies to a file.
+
+        Args:
+            filename (str): Path to the session file.
+        """
+        self.loader.save_session_to_file(filename)
+
+    def load_session_from_file(self, username: str, filename: str):
+        """
+        Load session cookies from a file.
+
+        Args:
+            username (str): Instagram username.
+            filename (str): Path to the session file.
+        """
+        self.loader.load_session_from_file(username, filename)
+
+    def test_login(self, raise_errors: bool = False) -> Optional[str]:
+        """
+        Check whether the current session is logged in.
+
+        Args:
+            raise_errors (bool): Whether to raise ConnectionException and AbortDownloadException, e.g. on a 429,
+                instead of returning None, so that a failed check can be told apart from a logged out session.
+
+        Returns:
+            Optional[str]: Username the session belongs to, or None if it is not logged in.
+        """
+        if not raise_errors:
+            return self.loader.test_login()
+        # The query of InstaloaderContext.test_login(), which logs these errors and returns None instead
+        data = self.loader.context.graphql_query(TEST_LOGIN_QUERY_HASH, {})
+        return data["data"]["user"]["username"] if data["data"]["user"] is not None else None
+
     def load_session_from_browser(self, browser: str, cookiefile: Optional[str] = None) -> bool:
         """
         Load session cookies from a browser.
@@ -76,24 +471,54 @@ class InstagramLoader:
             bool: True if cookies are loaded successfully, False otherwise.
         """
         if not bc3_library:
-            print("browser_cookie3 library is required to load cookies from browsers.", file=sys.stderr)
+            logger.error("browser_cookie3 library is required to load cookies from browsers.")
             return False
 
         try:
             cookies = self._get_cookies_from_browser(browser, cookiefile)
             self.loader.context.update_cookies(cookies)
-            username = self.loader.test_login()
+            username = self._test_login_cached(cookies)
             if username:
                 self.loader.context.username = username
-                print(f"Logged in as {username} using cookies from {browser}.")
+                logger.info("Logged in as %s using cookies from %s.", username, browser)
                 return True
             else:
-                print("Failed to log in using cookies.", file=sys.stderr)
+                _read_browser_cookies.cache_clear()
+                logger.warning("Failed to log in using cookies.")
                 return False
-        except Exception as e:
-            print(f"Failed to load cookies: {e}", file=sys.stderr)
+        # browser_cookie3 also raises e.g. KeyError without a D-Bus session and sqlite3 errors for bad cookie files
+        except (browser_cookie3.BrowserCookieError, InstaloaderException, OSError, sqlite3.Error, KeyError,
+                ValueError) as e:
+            _read_browser_cookies.cache_clear()
+            logger.warning("Failed to load cookies: %s", e, exc_info=True)
             return False
 
+    def _test_login_cached(self, cookies: dict) -> Optional[str]:
+        """
+        Check whether the given session cookies are logged in, reusing successful checks for LOGIN_CACHE_TTL seconds.
+
+        Args:
+            cookies (dict): Session cookies, already loaded into the loader.
+
+        Returns:
+            Optional[str]: Username the cookies belong to, or None if they are not logged in.
+        """
+        key = hashlib.blake2b(repr(sorted(cookies.items())).encode(), digest_size=16).hexdigest()
+        now = time.monotonic()
+        with self._login_cache_lock:
+            cached = self._login_cache.get(key)
+        if cached is not None and now - cached[1] < LOGIN_CACHE_TTL:
+            return cached[0]
+        username = self.loader.test_login()
+        with self._login_cache_lock:
+            for stale in [stale for stale, (_, ts) in self._login_cache.items() if now - ts >= LOGIN_CACHE_TTL]:
+                del self._login_cache[stale]
+            if username:
+                self._login_cache[key] = (username, time.monotonic())
+            else:
+                self._login_cache.pop(key, None)
+        return username
+
     def _get_cookies_from_browser(self, browser: str, cookiefile: Optional[str] = None) -> dict:
         """
         Retrieve cookies from a browser.
@@ -105,33 +530,43 @@ class InstagramLoader:
         Returns:
             dict: Dictionary of cookies.
         """
-        supported_browsers = {
-            "brave": browser_cookie3.brave,
-            "chrome": browser_cookie3.chrome,
-            "chromium": browser_cookie3.chromium,
-            "edge": browser_cookie3.edge,
-            "firefox": browser_cookie3.firefox,
-            "librewolf": browser_cookie3.librewolf,
-            "opera": browser_cookie3.opera,
-            "opera_gx": browser_cookie3.opera_gx,
-            "safari": browser_cookie3.safari,
-            "vivaldi": browser_cookie3.vivaldi,
-        }
-
-        if browser not in supported_browsers:
+        if browser not in _BROWSERS:
             raise InvalidArgumentException(f"Unsupported browser: {browser}")
 
-        cookies = {}
-        browser_cookies = list(supported_browsers[browser](cookie_file=cookiefile))
-        for cookie in browser_cookies:
-            if "instagram.com" in cookie.domain:
-                cookies[cookie.name] = cookie.value
+        cookies = dict(_read_browser_cookies(browser, cookiefile))
 
         if not cookies:
             raise LoginException(f"No Instagram cookies found in {browser}.")
 
         return cookies
 
+    def _get_profile(self, profile_name: str) -> Profile:
+        """
+        Look up a profile by name, reusing the result for PROFILE_CACHE_TTL seconds.
+
+        Args:
+            profile_name (str): Instagram profile name.
+
+        Returns:
+            Profile: The profile.
+        """
+        key = profile_name.lower()
+        now = time.monotonic()
+        with self._profile_cache_lock:
+            cached = self._profile_cache.get(key)
+        if cached is not None and now - cached[1] < PROFILE_CACHE_TTL:
+            return cached[0]
+        profile = Profile.from_username(self.loader.context, profile_name)
+        with self._profile_cache_lock:
+            for name in [name for name, (_, ts) in self._profile_cache.items() if now - ts >= PROFILE_CACHE_TTL]:
+                del self._profile_cache[name]
+            self._profile_cache[key] = (profile, time.monotonic())
+        return profile
+
+    def _forget_profile(self, profile_name: str):
+        with self._profile_cache_lock:
+            self._profile_cache.pop(profile_name.lower(), None)
+
     def download_profile(
         self,
         profile_name: str,
@@ -160,23 +595,25 @@ class InstagramLoader:
             bool: True if the download is successful, False otherwise.
         """
         try:
-            profile = Profile.from_username(self.loader.context, profile_name)
-            self.loader.download_profile(
-                profile,
-                download_posts=download_posts,
-                download_stories=download_stories,
-                download_highlights=download_highlights,
-                download_tagged=download_tagged,
-                download_reels=download_reels,
-                download_igtv=download_igtv,
+            profile = self._get_profile(profile_name)
+            self.loader.download_profiles(
+                {profile},
+                posts=download_posts,
+                stories=download_stories,
+                highlights=download_highlights,
+                tagged=download_tagged,
+                reels=download_reels,
+                igtv=download_igtv,
                 fast_update=fast_update,
+                raise_errors=True,
             )
             return True
         except ProfileNotExistsException as e:
-            print(f"Profile not found: {e}", file=sys.stderr)
+            self._forget_profile(profile_name)
+            logger.warning("Profile not found: %s", e)
             return False
         except InstaloaderException as e:
-            print(f"Failed to download profile: {e}", file=sys.stderr)
+            logger.warning("Failed to download profile: %s", e, exc_info=True)
             return False
 
     def download_hashtag(self, hashtag: str, max_count: Optional[int] = None) -> bool:
@@ -194,7 +631,7 @@ class InstagramLoader:
             self.loader.download_hashtag(hashtag=hashtag, max_count=max_count)
             return True
         except InstaloaderException as e:
-            print(f"Failed to download hashtag: {e}", file=sys.stderr)
+            logger.warning("Failed to download hashtag: %s", e, exc_info=True)
             return False
 
     def download_stories(self, profile_name: str) -> bool:
@@ -208,13 +645,98 @@ class InstagramLoader:
             bool: True if the download is successful, False otherwise.
         """
         try:
-            profile = Profile.from_username(self.loader.context, profile_name)
+            profile = self._get_profile(profile_name)
             self.loader.download_stories([profile])
             return True
+        except ProfileNotExistsException as e:
+            self._forget_profile(profile_name)
+            logger.warning("Profile not found: %s", e)
+            return False
         except InstaloaderException as e:
-            print(f"Failed to download stories: {e}", file=sys.stderr)
+            logger.warning("Failed to download stories: %s", e, exc_info=True)
             return False
 
     def close(self):
         """Close the Instagram loader and clean up resources."""
-        self.loader.close()
\ No newline at end of file
+        self.loader.close()
+
+
+class AsyncInstagramLoader:
+    """
+    Asynchronous counterpart of InstagramLoader.
+
+    Every call runs the blocking InstagramLoader method in a worker thread. Calls on the same instance are
+    serialized, since an Instaloader context must not be used by several threads at once.
+    """
+
+    def __init__(self):
+        """Initialize the Instagram loader."""
+        self.sync = InstagramLoader()
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        """Whether a call is running on the underlying InstagramLoader, so that further calls have to wait."""
+        return self._lock.locked()
+
+    def call_blocking(self, method: str, *args, **kwargs) -> Any:
+        """
+        Call a method of the underlying InstagramLoader, waiting for calls of other threads to finish.
+
+        Args:
+            method (str): Name of the InstagramLoader method.
+            *args: Positional arguments for the method.
+            **kwargs: Keyword arguments for the method.
+
+        Returns:
+            Any: Return value of the method.
+        """
+        with self._lock:
+            return getattr(self.sync, method)(*args, **kwargs)
+
+    async def _call(self, method: str, *args, **kwargs) -> Any:
+        return await asyncio.to_thread(self.call_blocking, method, *args, **kwargs)
+
+    async def login(self, username: str, password: str) -> bool:
+        """See InstagramLoader.login()."""
+        return await self._call("login", username, password)
+
+    async def save_session(self) -> dict:
+        """See InstagramLoader.save_session()."""
+        return await self._call("save_session")
+
+    async def load_session(self, username: str, session_data: dict):
+        """See InstagramLoader.load_session()."""
+        await self._call("load_session", username, session_data)
+
+    async def save_session_to_file(self, filename: str):
+        """See InstagramLoader.save_session_to_file()."""
+        await self._call("save_session_to_file", filename)
+
+    async def load_session_from_file(self, username: str, filename: str):
+        """See InstagramLoader.load_session_from_file()."""
+        await self._call("load_session_from_file", username, filename)
+
+    async def test_login(self, raise_errors: bool = False) -> Optional[str]:
+        """See InstagramLoader.test_login()."""
+        return await self._call("test_login", raise_errors)
+
+    async def load_session_from_browser(self, browser: str, cookiefile: Optional[str] = None) -> bool:
+        """See InstagramLoader.load_session_from_browser()."""
+        return await self._call("load_session_from_browser", browser, cookiefile)
+
+    async def download_profile(self, profile_name: str, **kwargs) -> bool:
+        """See InstagramLoader.download_profile()."""
+        return await self._call("download_profile", profile_name, **kwargs)
+
+    async def download_hashtag(self, hashtag: str, max_count: Optional[int] = None) -> bool:
+        """See InstagramLoader.download_hashtag()."""
+        return await self._call("download_hashtag", hashtag, max_count)
+
+    async def download_stories(self, profile_name: str) -> bool:
+        """See InstagramLoader.download_stories()."""
+        return await self._call("download_stories", profile_name)
+
+    async def close(self):
+        """See InstagramLoader.close()."""
+        await self._call("close")
\ No newline at end of file
@@ -1,14 +1,203 @@
-from flask import Flask, request, jsonify
-from instaloader.instaloader_api import InstagramLoader
+from quart import Quart, Response, request
+from quart.json.provider import DefaultJSONProvider
+from instaloader import AbortDownloadException, ConnectionException
+from instaloader.instaloader_api import (
+    RATE_BUCKETS,
+    AsyncInstagramLoader,
+    InstagramLoader,
+    TokenBucket,
+    is_valid_hashtag,
+    is_valid_profile_name,
+)
+import logging
+import logging.handlers
+import multiprocessing
 import os
+import pickle
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import suppress
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from multiprocessing.pool import Pool
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
 
-app = Flask(__name__)
-loader = InstagramLoader()
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+
+try:
+    import redis
+    import redis.asyncio
+
+    redis_client: Optional["redis.asyncio.Redis"] = redis.asyncio.Redis.from_url(REDIS_URL, decode_responses=False)
+except ImportError:
+    redis_client = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider using orjson for request parsing and response building.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+
+app = Quart(__name__)
+
+# Log records are handed to a queue and written to a rotating file by a background listener
+LOG_FILE = os.environ.get("INSTALOADER_LOG_FILE", "server.log")
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_log_file_handler = logging.handlers.RotatingFileHandler(LOG_FILE, maxBytes=10 << 20, backupCount=5)
+_log_file_handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_file_handler)
+# Writes the log records that pool workers send through a multiprocessing queue, started with the pool
+_worker_log_listener: Optional[logging.handlers.QueueListener] = None
+_LOGGER_NAMES = ("server", "instaloader_api")
+logger = logging.getLogger("server")
+for _name in _LOGGER_NAMES:
+    logging.getLogger(_name).addHandler(logging.handlers.QueueHandler(_log_queue))
+    logging.getLogger(_name).setLevel(logging.INFO)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+
+# Pool of loaders, one per Instagram account, mapping username to (loader, last-used timestamp)
+LOADERS: Dict[str, Tuple[AsyncInstagramLoader, float]] = {}
+LOADERS_LOCK = threading.RLock()
+MAX_LOADERS = int(os.environ.get("INSTALOADER_MAX_LOADERS", "32"))
 
 # Path to store session files
 SESSION_DIR = "sessions"
-if not os.path.exists(SESSION_DIR):
-    os.makedirs(SESSION_DIR)
+os.makedirs(SESSION_DIR, exist_ok=True)
+
+# Lifetime of cached sessions, matching Instagram's cookie lifetime
+SESSION_TTL = 86400 * 7
+# Lifetime of a cached successful session check
+AUTH_TTL = 60
+
+# Worker processes for /download_profiles, started with the server; recycled to bound their memory
+POOL: Optional[Pool] = None
+POOL_MAX_TASKS_PER_CHILD = 20
+
+# Downloads run on a bounded pool and are polled via /status/<job_id>; excess requests are rejected
+DOWNLOAD_WORKERS = int(os.environ.get("INSTALOADER_DOWNLOAD_WORKERS", "4"))
+MAX_QUEUED_DOWNLOADS = int(os.environ.get("INSTALOADER_MAX_QUEUED_DOWNLOADS", "16"))
+# Seconds for which finished jobs can still be polled
+JOB_TTL = 3600
+EXEC = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS, thread_name_prefix="download")
+# Maps job id to (future, submission timestamp)
+JOBS: Dict[str, Tuple[Future, float]] = {}
+# Jobs waiting behind the running job of their queue key; a key is present while one of its jobs runs
+_job_queues: Dict[Hashable, Deque[Tuple[Future, Callable[..., Any], tuple, Dict[str, Any]]]] = {}
+_jobs_lock = threading.Lock()
+_active_jobs = 0
+
+# Session files are written by a single background thread; only the newest snapshot per username is written
+_SESSION_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-writer")
+_pending_snapshots: Dict[str, bytes] = {}
+_pending_writes: Dict[str, Future] = {}
+_pending_lock = threading.Lock()
+
+
+@dataclass
+class DownloadProfileRequest:
+    """
+    Body of a /download_profile request.
+    """
+    profile_name: Optional[str] = None
+    username: Optional[str] = None
+    download_posts: bool = True
+    download_stories: bool = False
+    download_highlights: bool = False
+    download_tagged: bool = False
+    download_reels: bool = False
+    download_igtv: bool = False
+    fast_update: bool = False
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "DownloadProfileRequest":
+        """
+        Create a request from a decoded JSON body, ignoring undeclared keys.
+
+        Raises ValueError if a declared key has a value of the wrong type.
+        """
+        values = {key: data[key] for key in _DOWNLOAD_PROFILE_FIELDS if key in data}
+        for key, value in values.items():
+            if not isinstance(value, _DOWNLOAD_PROFILE_FIELDS[key]):
+                raise ValueError(f"Invalid value for {key}.")
+        return cls(**values)
+
+
+# Maps the fields of DownloadProfileRequest to the types their JSON values must have
+_DOWNLOAD_PROFILE_FIELDS: Dict[str, Tuple[type, ...]] = {
+    field.name: (bool,) if field.type is bool else (str, type(None)) for field in fields(DownloadProfileRequest)
+}
+
+
+def dump_json(payload: Any) -> bytes:
+    """
+    Serialize a payload to JSON.
+    """
+    return orjson.dumps(payload) if orjson is not None else app.json.dumps(payload).encode()
+
+
+def json_response(payload: Dict[str, Any], status: int) -> Response:
+    """
+    Build a JSON response directly, without the overhead of jsonify().
+    """
+    return Response(dump_json(payload), status=status, mimetype="application/json")
+
+
+def error_response(body: bytes, status: int) -> Response:
+    """
+    Build a response from one of the pre-serialized ERR_* bodies.
+    """
+    return Response(body, status=status, mimetype="application/json")
+
+
+def _failed_body(message: str) -> bytes:
+    return dump_json({"status": "failed", "message": message})
+
+
+# Constant error payloads, serialized once at import
+ERR_NOT_JSON_OBJECT = _failed_body("Request body must be a JSON object.")
+ERR_NO_CREDENTIALS = _failed_body("Username and password are required.")
+ERR_LOGIN = _failed_body("Login failed. Check your credentials.")
+ERR_RELOGIN = _failed_body("Re-login failed. Check your credentials.")
+ERR_NO_BROWSER = _failed_body("Username and browser name are required.")
+ERR_BROWSER_SESSION = _failed_body("Failed to load session from browser.")
+ERR_NO_PROFILE = _failed_body("Profile name is required.")
+ERR_INVALID_PROFILE = _failed_body("Invalid profile name.")
+ERR_NO_HASHTAG = _failed_body("Hashtag is required.")
+ERR_INVALID_HASHTAG = _failed_body("Invalid hashtag.")
+ERR_INVALID_MAX_COUNT = _failed_body("max_count must be a positive integer.")
+ERR_NO_PROFILE_LIST = _failed_body("A list of profile names is required.")
+ERR_TOO_MANY_DOWNLOADS = _failed_body("Too many downloads in progress. Try again later.")
+ERR_UNKNOWN_JOB = _failed_body("Unknown job id.")
+ERR_NOT_LOGGED_IN = _failed_body("Not logged in. Log in first or omit the username.")
+ERR_LOADER_BUSY = _failed_body("A download is in progress for this account. Try again later.")
+
+
+async def get_json_body() -> Optional[Dict[str, Any]]:
+    """
+    Decode the body of the current request as JSON, regardless of its content type.
+
+    Returns None if the body is not a JSON object.
+    """
+    data = await request.get_json(force=True, silent=True)
+    return data if isinstance(data, dict) else None
 
 
 def get_session_file(username: str) -> str:
@@ -18,154 +207,648 @@ def get_session_file(username: str) -> str:
     return os.path.join(SESSION_DIR, f"{username}.session")
 
 
+def _write_session_file(username: str):
+    """
+    Atomically write the newest pending session snapshot of a username to its session file.
+    """
+    with _pending_lock:
+        snapshot = _pending_snapshots.pop(username, None)
+        _pending_writes.pop(username, None)
+    if snapshot is None:
+        # Already written by an earlier write for the same username
+        return
+    fd, tempname = tempfile.mkstemp(dir=SESSION_DIR, prefix=f".{username}.", suffix=".temp")
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(snapshot)
+        os.replace(tempname, get_session_file(username))
+    except OSError as e:
+        logger.warning("Failed to save session: %s", e)
+        with suppress(OSError):
+            os.remove(tempname)
+
+
+def schedule_session_write(username: str, snapshot: bytes):
+    """
+    Queue a session snapshot to be written to the session file of a username, superseding pending writes.
+    """
+    with _pending_lock:
+        _pending_snapshots[username] = snapshot
+        stale = _pending_writes.pop(username, None)
+        if stale is not None:
+            stale.cancel()
+        _pending_writes[username] = _SESSION_WRITER.submit(_write_session_file, username)
+
+
+def _remove_session_file(username: str):
+    with suppress(FileNotFoundError):
+        os.remove(get_session_file(username))
+
+
+async def cache_session(username: str, loader: AsyncInstagramLoader):
+    """
+    Store the session of a loader in Redis and write it to its session file in the background.
+
+    Redis holds the session cookies as JSON, so that reading them back cannot execute code; session files keep
+    Instaloader's pickle format.
+    """
+    session_data = await loader.save_session()
+    if redis_client is not None:
+        try:
+            await redis_client.setex(f"igsess:{username}", SESSION_TTL, dump_json(session_data))
+        except redis.RedisError as e:
+            logger.warning("Failed to cache session: %s", e)
+    schedule_session_write(username, pickle.dumps(session_data))
+
+
+async def forget_session(username: str):
+    """
+    Remove a session that is no longer valid from Redis and delete its session file.
+    """
+    if redis_client is not None:
+        try:
+            await redis_client.delete(f"igsess:{username}", f"igauth:{username}")
+        except redis.RedisError as e:
+            logger.warning("Failed to remove cached session: %s", e)
+    with _pending_lock:
+        _pending_snapshots.pop(username, None)
+        stale = _pending_writes.pop(username, None)
+        if stale is not None:
+            stale.cancel()
+        # Queued on the writer thread, so that a write already in progress cannot recreate the file
+        _SESSION_WRITER.submit(_remove_session_file, username)
+
+
+async def load_cached_session(username: str, loader: AsyncInstagramLoader) -> bool:
+    """
+    Load a session from Redis into a loader.
+
+    Returns True if a cached session was found and loaded.
+    """
+    if redis_client is None:
+        return False
+    try:
+        blob = await redis_client.get(f"igsess:{username}")
+    except redis.RedisError as e:
+        logger.warning("Failed to read cached session: %s", e)
+        return False
+    if blob is None:
+        return False
+    try:
+        session_data = app.json.loads(blob)
+    except ValueError as e:
+        logger.warning("Failed to decode cached session: %s", e)
+        return False
+    await loader.load_session(username, session_data)
+    return True
+
+
+async def is_session_valid(username: str, loader: AsyncInstagramLoader) -> bool:
+    """
+    Check whether a loader is logged in as the given username, remembering a positive result for AUTH_TTL seconds.
+
+    Raises ConnectionException or AbortDownloadException if Instagram could not be asked, e.g. due to a 429.
+    """
+    if redis_client is not None:
+        try:
+            if await redis_client.exists(f"igauth:{username}"):
+                return True
+        except redis.RedisError as e:
+            logger.warning("Failed to read cached session check: %s", e)
+    # Instagram returns the username in its canonical lowercase form
+    if (await loader.test_login(raise_errors=True) or "").lower() != username.lower():
+        return False
+    if redis_client is not None:
+        try:
+            await redis_client.setex(f"igauth:{username}", AUTH_TTL, b"1")
+        except redis.RedisError as e:
+            logger.warning("Failed to cache session check: %s", e)
+    return True
+
+
+def _job_done(future: Future):
+    global _active_jobs
+    with _jobs_lock:
+        _active_jobs -= 1
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Download failed", exc_info=future.exception())
+
+
+def _run_jobs(key: Hashable):
+    """
+    Run the queued jobs of a queue key one after another on the current download worker.
+    """
+    while True:
+        with _jobs_lock:
+            jobs = _job_queues[key]
+            if not jobs:
+                del _job_queues[key]
+                return
+            future, fn, args, kwargs = jobs.popleft()
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:  # pylint:disable=broad-exception-caught
+                future.set_exception(e)
+
+
+def submit_job(key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Optional[str]:
+    """
+    Queue a download behind the other jobs with the same queue key, e.g. the same loader.
+
+    Jobs with the same key run one after another on a single download worker, so that jobs waiting for a busy
+    loader do not hold workers that other loaders could use.
+
+    Returns the id of the job, or None if DOWNLOAD_WORKERS + MAX_QUEUED_DOWNLOADS jobs are already outstanding.
+    """
+    global _active_jobs
+    future: Future = Future()
+    with _jobs_lock:
+        if _active_jobs >= DOWNLOAD_WORKERS + MAX_QUEUED_DOWNLOADS:
+            return None
+        _active_jobs += 1
+        now = time.monotonic()
+        for job_id in [job_id for job_id, (job, ts) in JOBS.items() if job.done() and now - ts > JOB_TTL]:
+            del JOBS[job_id]
+        job_id = uuid.uuid4().hex
+        JOBS[job_id] = (future, now)
+        if key in _job_queues:
+            _job_queues[key].append((future, fn, args, kwargs))
+        else:
+            _job_queues[key] = deque([(future, fn, args, kwargs)])
+            EXEC.submit(_run_jobs, key)
+    future.add_done_callback(_job_done)
+    return job_id
+
+
+def cancel_jobs(key: Hashable):
+    """
+    Cancel the jobs that are still queued behind a queue key. A job that is already running finishes.
+    """
+    with _jobs_lock:
+        futures = [future for future, _, _, _ in _job_queues.get(key, ())]
+    # Outside the lock, since the done callbacks of the futures take it
+    for future in futures:
+        future.cancel()
+
+
+def get_loader(username: Optional[str]) -> AsyncInstagramLoader:
+    """
+    Get the loader for a given username, creating it if necessary.
+
+    Requests without a username share one anonymous loader.
+    """
+    key = username or ""
+    with LOADERS_LOCK:
+        if key in LOADERS:
+            loader = LOADERS[key][0]
+        else:
+            loader = AsyncInstagramLoader()
+        LOADERS[key] = (loader, time.monotonic())
+        evict_loaders()
+        return loader
+
+
+def find_loader(username: Optional[str]) -> Optional[AsyncInstagramLoader]:
+    """
+    Get the loader of a username that has logged in, without creating one.
+
+    Requests without a username share one anonymous loader. Returns None if the username has no loader.
+    """
+    if not username:
+        return get_loader(None)
+    with LOADERS_LOCK:
+        entry = LOADERS.get(username)
+        if entry is None:
+            return None
+        LOADERS[username] = (entry[0], time.monotonic())
+        return entry[0]
+
+
+def login_loader(username: str) -> Optional[AsyncInstagramLoader]:
+    """
+    Get the loader to log a username in with: its stored loader, or a new one that add_loader() only stores once the
+    login has succeeded, so that failed logins cannot evict the loaders of other accounts.
+
+    Returns None if the stored loader is busy.
+    """
+    loader = find_loader(username)
+    if loader is None:
+        return AsyncInstagramLoader()
+    return None if loader.busy else loader
+
+
+def add_loader(username: str, loader: AsyncInstagramLoader):
+    """
+    Store the loader of a username that has logged in, evicting the least recently used loaders.
+    """
+    with LOADERS_LOCK:
+        previous = LOADERS.get(username)
+        LOADERS[username] = (loader, time.monotonic())
+        if previous is not None and previous[0] is not loader:
+            # A concurrent login of the same username stored its loader first
+            close_in_background(previous[0])
+        evict_loaders()
+
+
+async def discard_loader(username: str, loader: AsyncInstagramLoader):
+    """
+    Close a loader whose login failed, unless it is the stored loader of the username.
+    """
+    if find_loader(username) is not loader:
+        await loader.close()
+
+
+def evict_loaders():
+    """
+    Close and remove the least recently used loaders while the pool exceeds MAX_LOADERS.
+    """
+    with LOADERS_LOCK:
+        while len(LOADERS) > MAX_LOADERS:
+            oldest = min(LOADERS, key=lambda key: LOADERS[key][1])
+            close_in_background(LOADERS.pop(oldest)[0])
+
+
+def close_in_background(loader: AsyncInstagramLoader):
+    """
+    Cancel the queued jobs of a loader and close it once its running call has finished, without waiting for it.
+    """
+    cancel_jobs(loader)
+    threading.Thread(target=loader.call_blocking, args=("close",), daemon=True).start()
+
+
+def _init_worker(log_queue: "multiprocessing.Queue[logging.LogRecord]", rate_buckets: Dict[str, TokenBucket]):
+    """
+    Set up a pool worker process to log through log_queue and to share the request budgets of the server.
+    """
+    handler = logging.handlers.QueueHandler(log_queue)
+    for name in _LOGGER_NAMES:
+        worker_logger = logging.getLogger(name)
+        # The inherited handlers feed a queue that no thread of this process reads
+        for inherited in list(worker_logger.handlers):
+            worker_logger.removeHandler(inherited)
+        worker_logger.addHandler(handler)
+    RATE_BUCKETS.update(rate_buckets)
+
+
+@lru_cache(maxsize=1)
+def _worker_redis_client() -> "redis.Redis":
+    """
+    Get the Redis client of a pool worker process, created on first use and kept for the life of the process.
+    """
+    return redis.Redis.from_url(REDIS_URL)
+
+
+def _worker_load_session(username: str, loader: InstagramLoader):
+    """
+    Load the cached session of a username into a loader of a pool worker, falling back to its session file.
+    """
+    blob = None
+    if redis_client is not None:
+        try:
+            blob = _worker_redis_client().get(f"igsess:{username}")
+        except redis.RedisError as e:
+            logger.warning("Failed to read cached session: %s", e)
+    if blob is not None:
+        try:
+            loader.load_session(username, app.json.loads(blob))
+            return
+        except ValueError as e:
+            logger.warning("Failed to decode cached session: %s", e)
+    with suppress(FileNotFoundError):
+        loader.load_session_from_file(username, get_session_file(username))
+
+
+def _download_profiles(username: Optional[str], profile_names: List[str]) -> bool:
+    """
+    Download several profiles on the worker processes, returning whether all of them succeeded.
+    """
+    assert POOL is not None
+    results = POOL.map(_worker_download, [(username, profile_name) for profile_name in profile_names])
+    failed = [result["profile_name"] for result in results if result["status"] != "success"]
+    if failed:
+        logger.warning("Failed to download %d of %d profiles: %s", len(failed), len(results), ", ".join(failed))
+    return not failed
+
+
+def _worker_download(job: Tuple[Optional[str], str]) -> Dict[str, str]:
+    """
+    Download a profile in a pool worker process, using a loader of its own.
+    """
+    username, profile_name = job
+    loader = InstagramLoader()
+    try:
+        if username:
+            _worker_load_session(username, loader)
+        downloaded = loader.download_profile(profile_name)
+    finally:
+        loader.close()
+    return {"profile_name": profile_name, "status": "success" if downloaded else "failed"}
+
+
+@app.before_serving
+async def start_pool():
+    """
+    Start the log listener and the worker processes, forking where possible so that they share the already
+    imported modules.
+    """
+    global POOL, _worker_log_listener
+    _log_listener.start()
+    method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+    context = multiprocessing.get_context(method)
+    worker_log_queue = context.Queue()
+    _worker_log_listener = logging.handlers.QueueListener(worker_log_queue, _log_file_handler)
+    _worker_log_listener.start()
+    POOL = context.Pool(os.cpu_count(), initializer=_init_worker, initargs=(worker_log_queue, RATE_BUCKETS),
+                        maxtasksperchild=POOL_MAX_TASKS_PER_CHILD)
+
+
+@app.after_serving
+async def stop_pool():
+    """
+    Stop the worker processes and the log listener.
+    """
+    if POOL is not None:
+        POOL.terminate()
+        POOL.join()
+    if _worker_log_listener is not None:
+        _worker_log_listener.stop()
+    _log_listener.stop()
+
+
 @app.route('/login', methods=['POST'])
-def login():
+async def login():
     """
     Log in to Instagram using username and password.
     """
-    data = request.json
+    data = await get_json_body()
+    if data is None:
+        return error_response(ERR_NOT_JSON_OBJECT, 400)
     username = data.get('username')
     password = data.get('password')
     if not username or not password:
-        return jsonify({"status": "failed", "message": "Username and password are required."}), 400
+        return error_response(ERR_NO_CREDENTIALS, 400)
 
-    # Attempt to load an existing session
-    session_file = get_session_file(username)
-    if os.path.exists(session_file):
+    loader = login_loader(username)
+    if loader is None:
+        return error_response(ERR_LOADER_BUSY, 409)
+
+    # Attempt to reuse a cached session
+    if await load_cached_session(username, loader):
         try:
-            loader.load_session_from_file(username, session_file)
-            return jsonify({"status": "success", "message": "Logged in using existing session."}), 200
+            valid = await is_session_valid(username, loader)
+        except (ConnectionException, AbortDownloadException) as e:
+            # The session may well be valid, so keep using it, as sessions from files are used unchecked
+            logger.warning("Failed to check cached session: %s", e)
+            valid = True
+        if valid:
+            add_loader(username, loader)
+            return json_response({"status": "success", "message": "Logged in using cached session."}, 200)
+        # The session file holds the same session, so log in afresh
+        await forget_session(username)
+    else:
+        # Attempt to load an existing session
+        session_file = get_session_file(username)
+        try:
+            await loader.load_session_from_file(username, session_file)
+            await cache_session(username, loader)
+            add_loader(username, loader)
+            return json_response({"status": "success", "message": "Logged in using existing session."}, 200)
+        except FileNotFoundError:
+            pass
         except Exception as e:
-            print(f"Failed to load session: {e}")
+            logger.warning("Failed to load session: %s", e)
 
     # Perform a fresh login
-    if loader.login(username, password):
-        # Save the session to a file
-        loader.save_session_to_file(session_file)
-        return jsonify({"status": "success", "message": "Logged in successfully."}), 200
+    if await loader.login(username, password):
+        # Save the session
+        await cache_session(username, loader)
+        add_loader(username, loader)
+        return json_response({"status": "success", "message": "Logged in successfully."}, 200)
     else:
-        return jsonify({"status": "failed", "message": "Login failed. Check your credentials."}), 401
+        await discard_loader(username, loader)
+        return error_response(ERR_LOGIN, 401)
 
 
 @app.route('/reattempt_login', methods=['POST'])
-def reattempt_login():
+async def reattempt_login():
     """
     Reattempt login if the session is invalid or expired.
     """
-    data = request.json
+    data = await get_json_body()
+    if data is None:
+        return error_response(ERR_NOT_JSON_OBJECT, 400)
     username = data.get('username')
     password = data.get('password')
     if not username or not password:
-        return jsonify({"status": "failed", "message": "Username and password are required."}), 400
+        return error_response(ERR_NO_CREDENTIALS, 400)
 
     # Perform a fresh login
-    if loader.login(username, password):
-        # Save the session to a file
-        session_file = get_session_file(username)
-        loader.save_session_to_file(session_file)
-        return jsonify({"status": "success", "message": "Re-login successful."}), 200
+    loader = login_loader(username)
+    if loader is None:
+        return error_response(ERR_LOADER_BUSY, 409)
+    if await loader.login(username, password):
+        # Save the session
+        await cache_session(username, loader)
+        add_loader(username, loader)
+        return json_response({"status": "success", "message": "Re-login successful."}, 200)
     else:
-        return jsonify({"status": "failed", "message": "Re-login failed. Check your credentials."}), 401
+        await discard_loader(username, loader)
+        return error_response(ERR_RELOGIN, 401)
 
 
 @app.route('/load_session_from_browser', methods=['POST'])
-def load_session_from_browser():
+async def load_session_from_browser():
     """
     Load session cookies from a browser.
     """
-    data = request.json
+    data = await get_json_body()
+    if data is None:
+        return error_response(ERR_NOT_JSON_OBJECT, 400)
     username = data.get('username')  # Username is required to save the session
     browser = data.get('browser')
     cookiefile = data.get('cookiefile')
 
     if not username or not browser:
-        return jsonify({"status": "failed", "message": "Username and browser name are required."}), 400
+        return error_response(ERR_NO_BROWSER, 400)
 
-    if loader.load_session_from_browser(browser, cookiefile):
-        # Save the session to a file
-        session_file = get_session_file(username)
-        loader.save_session_to_file(session_file)
-        return jsonify({"status": "success", "message": f"Session loaded from {browser}."}), 200
+    loader = login_loader(username)
+    if loader is None:
+        return error_response(ERR_LOADER_BUSY, 409)
+    if await loader.load_session_from_browser(browser, cookiefile):
+        # Save the session
+        await cache_session(username, loader)
+        add_loader(username, loader)
+        return json_response({"status": "success", "message": f"Session loaded from {browser}."}, 200)
     else:
-        return jsonify({"status": "failed", "message": "Failed to load session from browser."}), 400
+        await discard_loader(username, loader)
+        return error_response(ERR_BROWSER_SESSION, 400)
 
 
 @app.route('/download_profile', methods=['POST'])
-def download_profile():
+async def download_profile():
     """
     Download content from a profile.
     """
-    data = request.json
-    profile_name = data.get('profile_name')
-    download_posts = data.get('download_posts', True)
-    download_stories = data.get('download_stories', False)
-    download_highlights = data.get('download_highlights', False)
-    download_tagged = data.get('download_tagged', False)
-    download_reels = data.get('download_reels', False)
-    download_igtv = data.get('download_igtv', False)
-    fast_update = data.get('fast_update', False)
+    data = await get_json_body()
+    if data is None:
+        return error_response(ERR_NOT_JSON_OBJECT, 400)
+    try:
+        req = DownloadProfileRequest.from_json(data)
+    except ValueError as e:
+        return json_response({"status": "failed", "message": str(e)}, 400)
 
-    if not profile_name:
-        return jsonify({"status": "failed", "message": "Profile name is required."}), 400
-
-    if loader.download_profile(
-        profile_name,
-        download_posts=download_posts,
-        download_stories=download_stories,
-        download_highlights=download_highlights,
-        download_tagged=download_tagged,
-        download_reels=download_reels,
-        download_igtv=download_igtv,
-        fast_update=fast_update,
-    ):
-        return jsonify({"status": "success", "message": f"Downloaded content from {profile_name}."}), 200
-    else:
-        return jsonify({"status": "failed", "message": f"Failed to download content from {profile_name}."}), 400
+    if not req.profile_name:
+        return error_response(ERR_NO_PROFILE, 400)
+    if not is_valid_profile_name(req.profile_name):
+        return error_response(ERR_INVALID_PROFILE, 400)
+
+    loader = find_loader(req.username)
+    if loader is None:
+        return error_response(ERR_NOT_LOGGED_IN, 401)
+
+    job_id = submit_job(
+        loader,
+        loader.call_blocking,
+        "download_profile",
+        req.profile_name,
+        download_posts=req.download_posts,
+        download_stories=req.download_stories,
+        download_highlights=req.download_highlights,
+        download_tagged=req.download_tagged,
+        download_reels=req.download_reels,
+        download_igtv=req.download_igtv,
+        fast_update=req.fast_update,
+    )
+    if job_id is None:
+        return error_response(ERR_TOO_MANY_DOWNLOADS, 429)
+    return json_response(
+        {"status": "queued", "job_id": job_id, "message": f"Queued download of content from {req.profile_name}."}, 202
+    )
 
 
 @app.route('/download_hashtag', methods=['POST'])
-def download_hashtag():
+async def download_hashtag():
     """
     Download posts from a hashtag.
     """
-    data = request.json
+    data = await get_json_body()
+    if data is None:
+        return error_response(ERR_NOT_JSON_OBJECT, 400)
     hashtag = data.get('hashtag')
     max_count = data.get('max_count')
 
     if not hashtag:
-        return jsonify({"status": "failed", "message": "Hashtag is required."}), 400
+        return error_response(ERR_NO_HASHTAG, 400)
+    if not is_valid_hashtag(hashtag):
+        return error_response(ERR_INVALID_HASHTAG, 400)
+    if max_count is not None and (isinstance(max_count, bool) or not isinstance(max_count, int) or max_count < 1):
+        return error_response(ERR_INVALID_MAX_COUNT, 400)
 
-    if loader.download_hashtag(hashtag, max_count):
-        return jsonify({"status": "success", "message": f"Downloaded posts from #{hashtag}."}), 200
-    else:
-        return jsonify({"status": "failed", "message": f"Failed to download posts from #{hashtag}."}), 400
+    loader = find_loader(data.get('username'))
+    if loader is None:
+        return error_response(ERR_NOT_LOGGED_IN, 401)
+
+    job_id = submit_job(loader, loader.call_blocking, "download_hashtag", hashtag, max_count)
+    if job_id is None:
+        return error_response(ERR_TOO_MANY_DOWNLOADS, 429)
+    return json_response(
+        {"status": "queued", "job_id": job_id, "message": f"Queued download of posts from #{hashtag}."}, 202
+    )
 
 
 @app.route('/download_stories', methods=['POST'])
-def download_stories():
+async def download_stories():
     """
     Download stories from a profile.
     """
-    data = request.json
+    data = await get_json_body()
+    if data is None:
+        return error_response(ERR_NOT_JSON_OBJECT, 400)
     profile_name = data.get('profile_name')
 
     if not profile_name:
-        return jsonify({"status": "failed", "message": "Profile name is required."}), 400
+        return error_response(ERR_NO_PROFILE, 400)
+    if not is_valid_profile_name(profile_name):
+        return error_response(ERR_INVALID_PROFILE, 400)
+
+    loader = find_loader(data.get('username'))
+    if loader is None:
+        return error_response(ERR_NOT_LOGGED_IN, 401)
+
+    job_id = submit_job(loader, loader.call_blocking, "download_stories", profile_name)
+    if job_id is None:
+        return error_response(ERR_TOO_MANY_DOWNLOADS, 429)
+    return json_response(
+        {"status": "queued", "job_id": job_id, "message": f"Queued download of stories from {profile_name}."}, 202
+    )
+
 
-    if loader.download_stories(profile_name):
-        return jsonify({"status": "success", "message": f"Downloaded stories from {profile_name}."}), 200
+@app.route('/status/<job_id>', methods=['GET'])
+async def status(job_id: str):
+    """
+    Report whether a queued download is pending, done, failed or cancelled.
+    """
+    with _jobs_lock:
+        job = JOBS.get(job_id)
+    if job is None:
+        return error_response(ERR_UNKNOWN_JOB, 404)
+
+    future = job[0]
+    if not future.done():
+        job_status = "pending"
+    elif future.cancelled():
+        job_status = "cancelled"
+    elif future.exception() is None and future.result():
+        job_status = "done"
     else:
-        return jsonify({"status": "failed", "message": f"Failed to download stories from {profile_name}."}), 400
+        job_status = "failed"
+    return json_response({"status": job_status, "job_id": job_id}, 200)
+
+
+@app.route('/download_profiles', methods=['POST'])
+async def download_profiles():
+    """
+    Download content from several profiles in parallel worker processes.
+    """
+    data = await get_json_body()
+    if data is None:
+        return error_response(ERR_NOT_JSON_OBJECT, 400)
+    profile_names = data.get('profile_names')
+
+    if not profile_names or not isinstance(profile_names, list):
+        return error_response(ERR_NO_PROFILE_LIST, 400)
+    if not all(is_valid_profile_name(profile_name) for profile_name in profile_names):
+        return error_response(ERR_INVALID_PROFILE, 400)
+
+    username = data.get('username')
+    if find_loader(username) is None:
+        return error_response(ERR_NOT_LOGGED_IN, 401)
+
+    # Batches share one queue, since each of them spreads over all worker processes
+    job_id = submit_job("download_profiles", _download_profiles, username, profile_names)
+    if job_id is None:
+        return error_response(ERR_TOO_MANY_DOWNLOADS, 429)
+    return json_response(
+        {"status": "queued", "job_id": job_id, "message": f"Queued download of {len(profile_names)} profiles."}, 202
+    )
 
 
 @app.route('/close', methods=['POST'])
-def close():
+async def close():
     """
-    Close the Instagram loader.
+    Close the Instagram loader of a given username.
     """
-    loader.close()
-    return jsonify({"status": "success", "message": "Loader closed successfully."}), 200
+    data = await get_json_body() or {}
+    with LOADERS_LOCK:
+        entry = LOADERS.pop(data.get('username') or "", None)
+    if entry is not None:
+        close_in_background(entry[0])
+    return json_response({"status": "success", "message": "Loader closed successfully."}, 200)
 
 
+# For production, serve with a single-process ASGI server, e.g.: uvicorn server.app:app --loop uvloop
+# Loaders, jobs and rate budgets live in this process and its worker pool, so several server processes would
+# neither see each other's jobs nor share the request budgets.
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,269 @@
+"""Offline Unit Tests for instaloader_api"""
+# pylint:disable=protected-access
+
+import errno
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+
+from instaloader import ConnectionException, InvalidArgumentException, Post
+from instaloader import instaloader_api
+
+
+def media_response(url: str) -> requests.Response:
+    """Response that Instagram's CDN would send for a media URL."""
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.headers['Content-Type'] = 'video/mp4' if url.endswith('.mp4') else 'image/jpeg'
+    resp._content = url.encode()
+    resp._content_consumed = True
+    return resp
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(instaloader_api.time, "monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_needs_no_wait(self):
+        bucket = instaloader_api.TokenBucket(rate=2, burst=3)
+        self.assertEqual([bucket.acquire() for _ in range(3)], [0.0, 0.0, 0.0])
+
+    def test_wait_after_burst(self):
+        bucket = instaloader_api.TokenBucket(rate=2, burst=1)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+        self.assertAlmostEqual(bucket.acquire(), 1.0)
+
+    def test_refill(self):
+        bucket = instaloader_api.TokenBucket(rate=2, burst=2)
+        bucket.acquire()
+        bucket.acquire()
+        self.now += 0.5
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+
+    def test_refill_capped_at_burst(self):
+        bucket = instaloader_api.TokenBucket(rate=2, burst=2)
+        self.now += 3600
+        self.assertEqual([bucket.acquire() for _ in range(2)], [0.0, 0.0])
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+
+    def test_bucket_from_env(self):
+        with mock.patch.dict(os.environ, {"INSTALOADER_TEST_PER_HOUR": "7200", "INSTALOADER_TEST_BURST": "5"}):
+            bucket = instaloader_api._bucket_from_env("test", 200, 20)
+        self.assertEqual(bucket.rate, 2)
+        self.assertEqual(bucket.burst, 5)
+
+    def test_bucket_from_env_rejects_zero_rate(self):
+        with mock.patch.dict(os.environ, {"INSTALOADER_TEST_PER_HOUR": "0"}):
+            with self.assertRaises(InvalidArgumentException):
+                instaloader_api._bucket_from_env("test", 200, 20)
+
+
+class TestValidation(unittest.TestCase):
+
+    def test_valid_profile_names(self):
+        for profile_name in ["instagram", "nat.geo", "a_b.c_1", "x" * 30]:
+            self.assertTrue(instaloader_api.is_valid_profile_name(profile_name), profile_name)
+
+    def test_invalid_profile_names(self):
+        for profile_name in ["", "x" * 31, "a b", "a/b", "../etc", "caf\u00e9", None, 42]:
+            self.assertFalse(instaloader_api.is_valid_profile_name(profile_name), profile_name)
+
+    def test_valid_hashtags(self):
+        for hashtag in ["kitten", "summer_2024", "caf\u00e9", "cafe\u0301", "\u6771\u4eac", "\u092d\u093e\u0930\u0924",
+                        "\u0661\u0662\u0663", "x" * 100]:
+            self.assertTrue(instaloader_api.is_valid_hashtag(hashtag), hashtag)
+
+    def test_invalid_hashtags(self):
+        for hashtag in ["", "x" * 101, "#kitten", "a b", "a-b", "a.b", "\U0001f431", None, ["kitten"]]:
+            self.assertFalse(instaloader_api.is_valid_hashtag(hashtag), hashtag)
+
+
+class TestMoveFile(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.src = os.path.join(self.dir, "src")
+        self.dst = os.path.join(self.dir, "dst")
+        self.content = os.urandom(3 * instaloader_api.DOWNLOAD_CHUNK_SIZE + 1)
+        with open(self.src, 'wb') as file:
+            file.write(self.content)
+
+    def across_file_systems(self):
+        replace = os.replace
+
+        def fake_replace(src, dst):
+            if src == self.src:
+                raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+            replace(src, dst)
+
+        return mock.patch.object(instaloader_api.os, "replace", side_effect=fake_replace)
+
+    def assertMoved(self):
+        self.assertFalse(os.path.exists(self.src))
+        self.assertFalse(os.path.exists(self.dst + '.temp'))
+        with open(self.dst, 'rb') as file:
+            self.assertEqual(file.read(), self.content)
+
+    def test_rename(self):
+        with mock.patch.object(instaloader_api, "_copy_file") as copy_file:
+            instaloader_api.move_file(self.src, self.dst)
+        copy_file.assert_not_called()
+        self.assertMoved()
+
+    def test_copy_across_file_systems(self):
+        with self.across_file_systems():
+            instaloader_api.move_file(self.src, self.dst)
+        self.assertMoved()
+
+    def test_copy_without_sendfile(self):
+        with self.across_file_systems(), \
+                mock.patch.object(instaloader_api.os, "sendfile", side_effect=OSError(errno.EINVAL, "")):
+            instaloader_api.move_file(self.src, self.dst)
+        self.assertMoved()
+
+    def test_other_errors_are_raised(self):
+        with mock.patch.object(instaloader_api.os, "replace", side_effect=OSError(errno.EACCES, "")):
+            with self.assertRaises(OSError):
+                instaloader_api.move_file(self.src, self.dst)
+        self.assertTrue(os.path.exists(self.src))
+
+    def test_failed_copy_is_removed(self):
+        def failing_copy(src, dst):  # pylint:disable=unused-argument
+            with open(dst, 'wb') as file:
+                file.write(b"partial")
+            raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+
+        with self.across_file_systems(), mock.patch.object(instaloader_api, "_copy_file", failing_copy):
+            with self.assertRaises(OSError):
+                instaloader_api.move_file(self.src, self.dst)
+        self.assertTrue(os.path.exists(self.src))
+        self.assertEqual(os.listdir(self.dir), ["src"])
+
+
+class TestStreamingInstaloaderContext(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.context = instaloader_api.StreamingInstaloaderContext(quiet=True)
+        self.addCleanup(self.context.close)
+
+    @staticmethod
+    def response(*chunks: bytes, error: bool = False) -> requests.Response:
+        def iter_content(chunk_size):  # pylint:disable=unused-argument
+            yield from chunks
+            if error:
+                raise requests.exceptions.ChunkedEncodingError("Connection broken")
+
+        resp = requests.Response()
+        resp.iter_content = iter_content  # type: ignore
+        return resp
+
+    def test_write_raw(self):
+        filename = os.path.join(self.dir, "media.jpg")
+        self.context.write_raw(self.response(b"abc", b"def"), filename)
+        with open(filename, 'rb') as file:
+            self.assertEqual(file.read(), b"abcdef")
+        self.assertEqual(os.listdir(self.dir), ["media.jpg"])
+
+    def test_failed_download_is_removed(self):
+        staging_dir = os.path.join(self.dir, "staging")
+        os.mkdir(staging_dir)
+        filename = os.path.join(self.dir, "media.jpg")
+        with mock.patch.object(instaloader_api, "STAGING_DIR", staging_dir):
+            with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                self.context.write_raw(self.response(b"abc", error=True), filename)
+        self.assertEqual(os.listdir(staging_dir), [])
+        self.assertFalse(os.path.exists(filename))
+
+
+class TestConcurrentInstaloader(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.loader = instaloader_api.ConcurrentInstaloader(sleep=False, quiet=True, save_metadata=False,
+                                                            post_metadata_txt_pattern="",
+                                                            dirname_pattern=os.path.join(self.dir, "{target}"))
+        self.addCleanup(self.loader.close)
+
+    def post(self, typename: str, **node) -> Post:
+        return Post(self.loader.context, {'__typename': typename, 'shortcode': 'Cabc', 'id': '1',
+                                          'taken_at_timestamp': 1700000000, 'owner': {'id': '2', 'username': 'owner'},
+                                          'is_video': typename == 'GraphVideo', **node})
+
+    def download_post(self, post: Post, get_raw=media_response) -> bool:
+        with mock.patch.object(self.loader.context, "get_raw", lambda url, _attempt=1: get_raw(url)):
+            return self.loader.download_post(post, "target")
+
+    def read(self, filename: str) -> bytes:
+        with open(os.path.join(self.dir, "target", filename), 'rb') as file:
+            return file.read()
+
+    def test_image_post(self):
+        self.assertTrue(self.download_post(self.post('GraphImage', display_url='https://cdn/image.jpg')))
+        self.assertEqual(self.read("2023-11-14_22-13-20_UTC.jpg"), b"https://cdn/image.jpg")
+
+    def test_failed_video_thumbnail_is_not_fatal(self):
+        def get_raw(url):
+            if url.endswith('.jpg'):
+                raise ConnectionException("Thumbnail not found")
+            return media_response(url)
+
+        post = self.post('GraphVideo', display_url='https://cdn/thumbnail.jpg', video_url='https://cdn/video.mp4')
+        self.assertTrue(self.download_post(post, get_raw))
+        self.assertEqual(os.listdir(os.path.join(self.dir, "target")), ["2023-11-14_22-13-20_UTC.mp4"])
+
+
+class TestInstagramLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.loader = instaloader_api.InstagramLoader()
+        self.addCleanup(self.loader.close)
+        self.loader.loader.dirname_pattern = os.path.join(self.dir, "{target}")
+        self.loader.loader.context.quiet = True
+        self.users = {"someone": {'username': 'someone', 'id': '2', 'is_private': False,
+                                  'profile_pic_url_hd': 'https://cdn/profile_pic.jpg',
+                                  'edge_owner_to_timeline_media': {'count': 0}}}
+        context = self.loader.loader.context
+        self.timeline_query = mock.Mock(return_value={'data': {
+            'xdt_api__v1__feed__user_timeline_graphql_connection': {'edges': [], 'page_info': {'has_next_page': False}}
+        }})
+        for name, fake in [("get_iphone_json", self.web_profile_info), ("doc_id_graphql_query", self.timeline_query),
+                           ("get_raw", lambda url, _attempt=1: media_response(url))]:
+            patcher = mock.patch.object(context, name, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def web_profile_info(self, path: str, params: dict) -> dict:  # pylint:disable=unused-argument
+        return {'data': {'user': self.users.get(path.rsplit('=', 1)[-1])}}
+
+    def test_download_profile(self):
+        self.assertTrue(self.loader.download_profile("someone"))
+        self.timeline_query.assert_called_once()
+        files = os.listdir(os.path.join(self.dir, "someone"))
+        self.assertTrue(any(filename.endswith("_profile_pic.jpg") for filename in files), files)
+
+    def test_download_profile_without_posts(self):
+        self.assertTrue(self.loader.download_profile("someone", download_posts=False))
+        self.timeline_query.assert_not_called()
+
+    def test_download_missing_profile(self):
+        self.assertFalse(self.loader.download_profile("nobody"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,290 @@
+"""Offline Unit Tests for the Instaloader API server"""
+# pylint:disable=protected-access
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import requests
+
+# The server creates its session directory and log file in the working directory when it is imported
+_WORKDIR = tempfile.mkdtemp()
+os.environ["INSTALOADER_LOG_FILE"] = os.path.join(_WORKDIR, "server.log")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_cwd = os.getcwd()
+os.chdir(_WORKDIR)
+try:
+    # pylint:disable=wrong-import-position
+    import instaloader
+    from server import app as server
+finally:
+    os.chdir(_cwd)
+
+
+def tearDownModule():
+    shutil.rmtree(_WORKDIR, ignore_errors=True)
+
+
+class TestSessionWrites(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        patcher = mock.patch.object(server, "SESSION_DIR", self.dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def block_writer() -> threading.Event:
+        release = threading.Event()
+        server._SESSION_WRITER.submit(release.wait)
+        return release
+
+    @staticmethod
+    def wait_for_writer():
+        server._SESSION_WRITER.submit(lambda: None).result()
+
+    def read_session_file(self, username: str) -> bytes:
+        with open(server.get_session_file(username), 'rb') as file:
+            return file.read()
+
+    def test_newest_snapshot_is_written_once(self):
+        release = self.block_writer()
+        with mock.patch.object(server.os, "replace", wraps=os.replace) as replace:
+            for i in range(3):
+                server.schedule_session_write("user", f"snapshot {i}".encode())
+            release.set()
+            self.wait_for_writer()
+        replace.assert_called_once()
+        self.assertEqual(self.read_session_file("user"), b"snapshot 2")
+        self.assertEqual(os.listdir(self.dir), ["user.session"])
+
+    def test_usernames_are_written_separately(self):
+        release = self.block_writer()
+        server.schedule_session_write("alice", b"alice 1")
+        server.schedule_session_write("bob", b"bob 1")
+        server.schedule_session_write("alice", b"alice 2")
+        release.set()
+        self.wait_for_writer()
+        self.assertEqual(self.read_session_file("alice"), b"alice 2")
+        self.assertEqual(self.read_session_file("bob"), b"bob 1")
+
+    def test_later_snapshots_are_written_again(self):
+        server.schedule_session_write("user", b"snapshot 1")
+        self.wait_for_writer()
+        server.schedule_session_write("user", b"snapshot 2")
+        self.wait_for_writer()
+        self.assertEqual(self.read_session_file("user"), b"snapshot 2")
+
+
+class TestLogin(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        for name, value in [("redis_client", None), ("SESSION_DIR", self.dir), ("LOADERS", {}), ("MAX_LOADERS", 2)]:
+            patcher = mock.patch.object(server, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = server.app.test_client()
+
+    def login(self, username: str, password: str) -> int:
+        async def send():
+            response = await self.client.post("/login", json={"username": username, "password": password})
+            return response.status_code
+
+        def instagram_login(_, _user, passwd):
+            if passwd != "secret":
+                raise instaloader.BadCredentialsException("Wrong password.")
+
+        with mock.patch.object(instaloader.Instaloader, "login", instagram_login), \
+                mock.patch.object(server, "cache_session"):
+            return asyncio.run(send())
+
+    def test_loader_is_stored_after_login(self):
+        self.assertEqual(self.login("alice", "secret"), 200)
+        self.assertIn("alice", server.LOADERS)
+
+    def test_failed_logins_do_not_evict_loaders(self):
+        self.assertEqual(self.login("alice", "secret"), 200)
+        self.assertEqual([self.login(f"mallory{i}", "wrong") for i in range(3)], [401, 401, 401])
+        self.assertEqual(list(server.LOADERS), ["alice"])
+
+    def login_with_cached_session(self, username: str, graphql_query) -> mock.Mock:
+        """Log in with a cached session checked by graphql_query, returning the mocked forget_session()."""
+        with mock.patch.object(server, "load_cached_session", mock.AsyncMock(return_value=True)), \
+                mock.patch.object(server, "forget_session", mock.AsyncMock()) as forget_session, \
+                mock.patch.object(instaloader.InstaloaderContext, "graphql_query", graphql_query):
+            self.assertEqual(self.login(username, "secret"), 200)
+        return forget_session
+
+    def test_cached_session_is_checked_case_insensitively(self):
+        forget_session = self.login_with_cached_session(
+            "Alice", lambda *args: {"data": {"user": {"username": "alice"}}}
+        )
+        forget_session.assert_not_called()
+        self.assertIn("Alice", server.LOADERS)
+
+    def test_cached_session_is_kept_if_check_fails(self):
+        def graphql_query(*args):
+            raise instaloader.TooManyRequestsException("429 Too Many Requests")
+
+        self.login_with_cached_session("alice", graphql_query).assert_not_called()
+
+    def test_cached_session_of_other_user_is_forgotten(self):
+        self.login_with_cached_session(
+            "alice", lambda *args: {"data": {"user": {"username": "bob"}}}
+        ).assert_awaited_once_with("alice")
+
+    def test_logged_out_cached_session_is_forgotten(self):
+        self.login_with_cached_session(
+            "alice", lambda *args: {"data": {"user": None}}
+        ).assert_awaited_once_with("alice")
+
+
+class TestJobs(unittest.TestCase):
+
+    def setUp(self):
+        for name, value in [("redis_client", None), ("DOWNLOAD_WORKERS", 2), ("MAX_QUEUED_DOWNLOADS", 1),
+                            ("EXEC", ThreadPoolExecutor(max_workers=2)), ("LOADERS", {}), ("JOBS", {})]:
+            patcher = mock.patch.object(server, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = server.app.test_client()
+        self.release = threading.Event()
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        self.addCleanup(self.finish_jobs)
+
+    def finish_jobs(self):
+        self.release.set()
+        for _ in range(1000):
+            with server._jobs_lock:
+                if not server._active_jobs:
+                    break
+            threading.Event().wait(0.01)
+        for loader, _ in server.LOADERS.values():
+            loader.sync.close()
+        server.EXEC.shutdown()
+
+    def loader(self, username: str = "", wait: bool = True) -> server.AsyncInstagramLoader:
+        """
+        Add a loader whose requests to Instagram wait for self.release if wait is set, and which finds every profile
+        except those starting with 'bad'.
+        """
+        loader = server.get_loader(username)
+        loader.sync.loader.dirname_pattern = os.path.join(self.dir, "{target}")
+        context = loader.sync.loader.context
+        context.quiet = True
+
+        def get_iphone_json(path: str, params: dict) -> dict:  # pylint:disable=unused-argument
+            if wait:
+                self.release.wait()
+            profile_name = path.rsplit("=", 1)[-1]
+            if profile_name.startswith("bad"):
+                return {"data": {"user": None}}
+            return {"data": {"user": {"username": profile_name, "id": "2", "is_private": False,
+                                      "profile_pic_url_hd": "https://cdn/profile_pic.jpg",
+                                      "edge_owner_to_timeline_media": {"count": 0}}}}
+
+        def get_raw(url: str, _attempt: int = 1) -> requests.Response:
+            resp = requests.Response()
+            resp.status_code = 200
+            resp.headers["Content-Type"] = "image/jpeg"
+            resp._content = url.encode()
+            resp._content_consumed = True
+            return resp
+
+        context.get_iphone_json = get_iphone_json
+        context.get_raw = get_raw
+        context.doc_id_graphql_query = lambda *args, **kwargs: {"data": {
+            "xdt_api__v1__feed__user_timeline_graphql_connection": {"edges": [], "page_info": {"has_next_page": False}}
+        }}
+        return loader
+
+    def request(self, method: str, path: str, **kwargs):
+        async def send():
+            response = await getattr(self.client, method)(path, **kwargs)
+            return response.status_code, await response.get_json()
+
+        return asyncio.run(send())
+
+    def download(self, profile_name: str = "instagram", username: str = ""):
+        return self.request("post", "/download_profile", json={"profile_name": profile_name, "username": username})
+
+    def job_status(self, job_id: str) -> str:
+        status, body = self.request("get", f"/status/{job_id}")
+        self.assertEqual(status, 200)
+        return body["status"]
+
+    @staticmethod
+    def wait_for(job_id: str):
+        with server._jobs_lock:
+            future = server.JOBS[job_id][0]
+        future.exception(timeout=10)
+
+    def test_status(self):
+        self.loader()
+        job_ids = [self.download(profile_name)[1]["job_id"] for profile_name in ["instagram", "bad_profile"]]
+        self.assertEqual([self.job_status(job_id) for job_id in job_ids], ["pending", "pending"])
+        self.release.set()
+        for job_id in job_ids:
+            self.wait_for(job_id)
+        self.assertEqual([self.job_status(job_id) for job_id in job_ids], ["done", "failed"])
+
+    def test_unknown_job(self):
+        self.assertEqual(self.request("get", "/status/unknown")[0], 404)
+
+    def test_too_many_downloads(self):
+        self.loader()
+        self.assertEqual([self.download()[0] for _ in range(4)], [202, 202, 202, 429])
+
+    def test_unknown_username(self):
+        self.assertEqual(self.download(username="nobody")[0], 401)
+        self.assertNotIn("nobody", server.LOADERS)
+
+    def test_jobs_of_one_loader_use_one_worker(self):
+        self.loader()
+        self.loader("alice", wait=False)
+        blocked = [self.download()[1]["job_id"] for _ in range(2)]
+        job_id = self.download(username="alice")[1]["job_id"]
+        self.wait_for(job_id)
+        self.assertEqual(self.job_status(job_id), "done")
+        self.assertEqual([self.job_status(job_id) for job_id in blocked], ["pending", "pending"])
+
+    def test_login_while_busy(self):
+        self.loader("alice")
+        job_id = self.download(username="alice")[1]["job_id"]
+        for _ in range(1000):
+            if server.LOADERS["alice"][0].busy:
+                break
+            threading.Event().wait(0.01)
+        status, _ = self.request("post", "/login", json={"username": "alice", "password": "secret"})
+        self.assertEqual(status, 409)
+        self.assertEqual(self.job_status(job_id), "pending")
+
+    def test_close_cancels_queued_jobs(self):
+        loader = self.loader("alice")
+        running, queued = [self.download(profile_name, username="alice")[1]["job_id"]
+                           for profile_name in ["instagram", "queued"]]
+        for _ in range(1000):
+            if loader.busy:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(self.request("post", "/close", json={"username": "alice"})[0], 200)
+        self.assertEqual(self.job_status(queued), "cancelled")
+        self.assertEqual(self.job_status(running), "pending")
+        self.release.set()
+        self.wait_for(running)
+        self.assertEqual(self.job_status(running), "done")
+        self.assertFalse(os.path.exists(os.path.join(self.dir, "queued")))
+
+
+if __name__ == '__main__':
+    unittest.main()